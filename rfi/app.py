@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """RFI repl and main logic."""
-from inspect import cleandoc
+import re
+from inspect import Parameter, cleandoc, signature
+from types import MappingProxyType
 
 from dice import DiceBaseException, roll
 from prompt_toolkit import Application
@@ -9,7 +11,6 @@ from prompt_toolkit.filters import Condition
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.layout.containers import HSplit, Window
 from prompt_toolkit.layout.layout import Layout
-from prompt_toolkit.utils import test_callable_args
 from prompt_toolkit.widgets import CompletionsToolbar, TextArea
 from texttable import Texttable
 
@@ -17,45 +18,120 @@ from . import __version__ as rfi_version  # pylint: disable=cyclic-import
 from .initiative import InitiativeQueue
 
 
+_CONSTANT_EXPR = re.compile(r"[+-]?[0-9]+")
+
+
 def _dice_roll_sum(dice_expr: str):
+    # Plain numbers are the most common input, and don't need the dice parser
+    if _CONSTANT_EXPR.fullmatch(dice_expr):
+        return int(dice_expr)
+
     try:
         result = roll(dice_expr)
     except DiceBaseException:
         raise ValueError(f'Invalid dice expression ("{dice_expr}")')
 
-    try:
+    if isinstance(result, list):
         return sum(result)
-    except TypeError:
-        return result
+    return result
+
+
+_POSITIONAL_KINDS = (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)
+
+
+def _arity_of(function):
+    # Same rules as calling function(self, *args): keyword-only parameters can't be
+    # filled, and a *args parameter lifts the upper bound.
+    params = list(signature(function).parameters.values())[1:]
+    positional = [param for param in params if param.kind in _POSITIONAL_KINDS]
+    n_required = sum(1 for param in positional if param.default is param.empty)
+    if any(param.kind is Parameter.VAR_POSITIONAL for param in params):
+        return n_required, float("inf")
+    return n_required, len(positional)
+
+
+def _make_dispatcher(cmd: str, function, usage: str):
+    min_args, max_args = _arity_of(function)
+    invalid_usage = cleandoc(
+        f"""
+        Invalid usage of {cmd}.
+        Expected usage: {usage}
+        Type help {cmd} for more information.
+        """
+    )
+
+    def dispatch(repl_instance, cmd_args):
+        if not min_args <= len(cmd_args) <= max_args:
+            return invalid_usage
+
+        try:
+            return function(repl_instance, *cmd_args)
+        except (ValueError, RuntimeError) as err:
+            return f"Error: {err}"
+
+    return dispatch
 
 
 class Repl(Application):
     # pylint: disable=no-self-use
     """REPL for RFI."""
 
-    command_usage = {
-        "help": "help [command]",
-        "add": "add {name} {initiative}",
-        "remove": "remove {name}",
-        "show": "show",
-        "start": "start",
-        "reset": "reset",
-        "removeall": "removeall",
-        "next": "next",
-        "prev": "prev",
-        "chname": "chname {name} {new_name}",
-        "chinit": "chinit {name} {new_init}",
-        "move": "move {name} (up|down)",
-        "version": "version",
-        "welcome": "welcome",
-        "quit": "quit",
-    }
-    commands = list(command_usage.keys())
+    command_usage = MappingProxyType(
+        {
+            "help": "help [command]",
+            "add": "add {name} {initiative}",
+            "remove": "remove {name}",
+            "show": "show",
+            "start": "start",
+            "reset": "reset",
+            "removeall": "removeall",
+            "next": "next",
+            "prev": "prev",
+            "chname": "chname {name} {new_name}",
+            "chinit": "chinit {name} {new_init}",
+            "move": "move {name} (up|down)",
+            "version": "version",
+            "welcome": "welcome",
+            "quit": "quit",
+        }
+    )
+    commands = tuple(command_usage)
+
+    # Completers that don't depend on the state of a Repl
+    _command_completer = WordCompleter(commands)
+    _up_down_completer = WordCompleter(["up", "down"])
+    _dummy_completer = DummyCompleter()
+
+    welcome_message = (
+        "\n"
+        f"rfi version {rfi_version}\n"
+        "\n"
+        'Type help to list available commands, or "help command".\n'
+        "Roll for initiative!\n"
+        "\n"
+        "\n"
+        'Hint: "add" and "chinit" can accept diceroll expressions!\n'
+    )
+
+    _help_all_header = (
+        "Try help help for more information.\nUse the up and down arrows to scroll.\n\n"
+    )
+    _help_all_footer = "\n\nUse help {command} for more information about a specific command."
+
+    # Move methods of InitiativeQueue, by direction
+    _move_dispatch = {"up": InitiativeQueue.move_up, "down": InitiativeQueue.move_down}
+
+    # Drawn help overview by table width, the same for every Repl
+    _help_all_cache = {}
 
     def __init__(self):
         """See help(Repl) for more information."""
         self.queue = InitiativeQueue()
         self.cursor_pos = None
+        # Version of the queue, and its renders by (cursor position, width)
+        self._show_cache = (None, {})
+        # Last tokenized input, shared by the parser, the completer and key bindings
+        self._last_tokenized = ("", ())
 
         self.completer = self._create_completer()
         self.input_field, self.output_area = self._create_text_areas()
@@ -67,37 +143,22 @@ class Repl(Application):
 
     def parse(self, user_input):
         """Parse a user input string, and return the corresponding output."""
-        try:
-            cmd, *cmd_args = user_input.split()
-        except ValueError:
-            if self.cursor_pos is not None:
-                # Empty input, translate to "next" if already started
-                cmd, cmd_args = "next", []
-            elif self.queue:
-                cmd, cmd_args = "show", []
-            else:
-                cmd, cmd_args = "help", []
+        tokens = self._tokenize(user_input)
+        if tokens:
+            cmd, cmd_args = tokens[0], tokens[1:]
+        elif self.cursor_pos is not None:
+            # Empty input, translate to "next" if already started
+            cmd, cmd_args = "next", ()
+        elif self.queue:
+            cmd, cmd_args = "show", ()
+        else:
+            cmd, cmd_args = "help", ()
 
-        try:
-            cmd_function = self._get_command_function(cmd)
-        except AttributeError:
+        dispatch = _DISPATCH.get(cmd)
+        if dispatch is None:
             return f"Unknown command: {cmd}."
 
-        if not test_callable_args(cmd_function, cmd_args):
-            return cleandoc(
-                f"""
-                Invalid usage of {cmd}.
-                Expected usage: {self.command_usage[cmd]}
-                Type help {cmd} for more information.
-                """
-            )
-
-        try:
-            return cmd_function(*cmd_args)
-        except (ValueError, RuntimeError) as err:
-            return f"Error: {err}"
-
-        return ""
+        return dispatch(self, cmd_args)
 
     def cmd_help(self, cmd: str = None):
         """
@@ -135,12 +196,9 @@ class Repl(Application):
 
         """
         initiative = _dice_roll_sum(init_expr)
-        self.queue.add(name, initiative)
-        try:
-            if self.queue.position_of(name) <= self.cursor_pos:
-                self._move_cursor(+1)
-        except TypeError:
-            pass
+        position = self.queue.add(name, initiative)
+        if self.cursor_pos is not None and position <= self.cursor_pos:
+            self._move_cursor(+1)
         return self._show_queue()
 
     def cmd_remove(self, name: str):
@@ -157,12 +215,9 @@ class Repl(Application):
             CTRL-R
 
         """
-        try:
-            if self.queue.position_of(name) < self.cursor_pos:
-                self._move_cursor(-1)
-        except TypeError:
-            pass
-        self.queue.remove(name)
+        position = self.queue.remove(name)
+        if self.cursor_pos is not None and position < self.cursor_pos:
+            self._move_cursor(-1)
         self._fix_cursor()
         return self._show_queue()
 
@@ -211,19 +266,13 @@ class Repl(Application):
             ENTER with empty input field.
 
         """
-        try:
-            self._move_cursor(+1)
-            return self._show_queue()
-        except TypeError:
-            raise RuntimeError('Attempt to move cursor before call to "start"')
+        self._move_cursor(+1)
+        return self._show_queue()
 
     def cmd_prev(self):
         """Move cursor prev one position."""
-        try:
-            self._move_cursor(-1)
-            return self._show_queue()
-        except TypeError:
-            raise RuntimeError('Attempt to move cursor before call to "start"')
+        self._move_cursor(-1)
+        return self._show_queue()
 
     def cmd_move(self, name: str, direction: str):
         """
@@ -237,15 +286,13 @@ class Repl(Application):
             move Isis down
 
         """
-        if direction == "up":
-            self.queue.move_up(name)
-            return self._show_queue()
-        elif direction == "down":
-            self.queue.move_down(name)
-            return self._show_queue()
-        else:
+        move = self._move_dispatch.get(direction)
+        if move is None:
             raise ValueError('Direction must be "up" or "down"')
 
+        move(self.queue, name)
+        return self._show_queue()
+
     def cmd_removeall(self):
         """Remove all entries of initiative queue."""
         self.queue.clear()
@@ -276,95 +323,104 @@ class Repl(Application):
 
     def cmd_welcome(self):
         """Show welcome message again."""
-        text = "\n"
-        text += f"rfi version {rfi_version}\n"
-        text += "\n"
-        text += 'Type help to list available commands, or "help command".\n'
-        text += "Roll for initiative!\n"
-        text += "\n"
-        text += "\n"
-        text += 'Hint: "add" and "chinit" can accept diceroll expressions!\n'
-        return text
+        return self.welcome_message
 
-    def _make_table(self):
-        table = Texttable()
+    def _table_width(self):
         screen_size = self.output.get_size()
-        table.set_max_width(min(90, screen_size.columns))
+        return min(90, screen_size.columns)
+
+    @staticmethod
+    def _make_table(width: int):
+        table = Texttable()
+        table.set_max_width(width)
         return table
 
-    def _get_command_function(self, cmd: str):
-        return getattr(self, f"cmd_{cmd}")
+    def _tokenize(self, text: str):
+        last_text, tokens = self._last_tokenized
+        if text != last_text:
+            tokens = tuple(text.split())
+            self._last_tokenized = (text, tokens)
+        return tokens
 
     def _help_all(self):
-        table = self._make_table()
+        # The overview only depends on the table width, so render it once per width
+        width = self._table_width()
+        text = self._help_all_cache.get(width)
+        if text is not None:
+            return text
+
+        table = self._make_table(width)
         table.set_deco(Texttable.HEADER | Texttable.VLINES)
         table.header(["Command", "Description", "Usage"])
         table.set_cols_align("lcl")
-        for cmd, cmd_usage in self.command_usage.items():
-            cmd_help = self._get_cmd_short_help(cmd)
-            if cmd_help is not None:
-                table.add_row([cmd, cmd_help, cmd_usage])
-
-        text = ""
-        text += "Try help help for more information.\n"
-        text += "Use the up and down arrows to scroll.\n\n"
-        text += table.draw()
-        text += "\n\n"
-        text += "Use help {command} for more information about a specific command."
+        table.add_rows(_HELP_ROWS, header=False)
+
+        text = self._help_all_header + table.draw() + self._help_all_footer
+        self._help_all_cache[width] = text
         return text
 
     def _help_single(self, cmd: str):
-        cmd_help = self._get_cmd_full_help(cmd)
+        cmd_help = _FULL_HELP.get(cmd)
         if cmd_help is None:
             raise ValueError(f'No help available for command "{cmd}"')
         return cmd_help
 
-    def _get_cmd_short_help(self, cmd: str):
-        try:
-            full_help = self._get_cmd_full_help(cmd)
-            return full_help.split("\n", maxsplit=1)[0]
-        except AttributeError:
-            return None
+    def _move_cursor(self, delta: int):
+        if self.cursor_pos is None:
+            raise RuntimeError('Attempt to move cursor before call to "start"')
 
-    def _get_cmd_full_help(self, cmd: str):
-        try:
-            return cleandoc(self._get_command_function(cmd).__doc__)
-        except AttributeError:
-            return None
+        n_entries = len(self.queue)
+        if not n_entries:
+            self.cursor_pos = None
+            return
 
-    def _move_cursor(self, delta: int):
-        self.cursor_pos += delta + len(self.queue)
-        self._fix_cursor()
+        # The cursor only ever moves by one step, so wrapping around needs
+        # at most one correction.
+        position = self.cursor_pos + delta
+        if position >= n_entries:
+            position -= n_entries
+        elif position < 0:
+            position += n_entries
+        self.cursor_pos = position
 
     def _fix_cursor(self):
         if self.cursor_pos is None:
             # Nothing to fix
             return
 
-        try:
+        if self.queue:
             self.cursor_pos %= len(self.queue)
-        except ZeroDivisionError:
-            # This happens when calling % len and the queue is empty,
-            # therefore we can set the cursor to None
+        else:
+            # No entry left to point to
             self.cursor_pos = None
 
     def _show_queue(self):
-        if self.queue:
-            table = self._make_table()
-            table.set_deco(0)
-            for position, (name, initiative) in enumerate(self.queue):
-                if position == self.cursor_pos:
-                    row = ["[", f"{initiative}", f"{name}", "]"]
-                else:
-                    row = ["", str(initiative), name, ""]
-                table.add_row(row)
-
-            output = table.draw()
-        else:
-            output = "Empty initiative queue."
-
+        if not self.queue:
+            return "Empty initiative queue."
+
+        version, renders = self._show_cache
+        if version != self.queue.version:
+            # Renders of previous versions of the queue will never be shown again
+            renders = {}
+            self._show_cache = (self.queue.version, renders)
+
+        # Cursor movement alone, e.g. "prev" followed by "next", reuses earlier renders
+        width = self._table_width()
+        output = renders.get((self.cursor_pos, width))
+        if output is None:
+            output = self._draw_queue(self.queue.format_rows(self.cursor_pos), width)
+            renders[(self.cursor_pos, width)] = output
         return output
 
+    @staticmethod
+    def _draw_queue(rows: tuple, width: int):
+        table = Repl._make_table(width)
+        table.set_deco(0)
+        for row in rows:
+            table.add_row(row)
+
+        return table.draw()
+
     def _create_keybindings(self):
         keybindings = KeyBindings()
 
@@ -374,7 +430,7 @@ class Repl(Application):
 
         @Condition
         def is_typing_command():
-            tokens = self.input_field.text.split()
+            tokens = self._tokenize(self.input_field.text)
             return len(tokens) <= 1
 
         @keybindings.add("up")
@@ -421,38 +477,33 @@ class Repl(Application):
         return input_field, output_area
 
     def _create_completer(self):
-        command_completer = WordCompleter(self.commands)
+        command_completer = self._command_completer
         name_completer = WordCompleter(self.queue.names, ignore_case=True)
-        up_down_completer = WordCompleter(["up", "down"])
-        dummy_completer = DummyCompleter()
-
-        commands_with_name_arg = frozenset({"remove", "move", "chinit", "chname"})
+        up_down_completer = self._up_down_completer
+        dummy_completer = self._dummy_completer
+
+        # Completer for each (command, index of the argument being typed)
+        arg_completers = {
+            # Show available commands, now as possible arguments
+            ("help", 1): command_completer,
+            ("remove", 1): name_completer,
+            ("chinit", 1): name_completer,
+            ("chname", 1): name_completer,
+            ("move", 1): name_completer,
+            ("move", 2): up_down_completer,
+        }
 
         def get_correct_completer():
             input_text = self.input_field.text
             middle_of_arg = not input_text.endswith(" ")
-            input_tokens = input_text.split()
-            n_tokens = len(input_tokens)
-            if n_tokens == 0 or n_tokens == 1 and middle_of_arg:
+            input_tokens = self._tokenize(input_text)
+            arg_idx = len(input_tokens) - (1 if middle_of_arg else 0)
+            if arg_idx <= 0:
                 # Currently typing command, or input field is empty
                 return command_completer
-            else:
-                cmd = input_tokens[0]
-                if cmd == "help":
-                    # Show available commands, now as possible arguments
-                    return command_completer
-                elif cmd in commands_with_name_arg:
-                    if n_tokens == 1 or n_tokens == 2 and middle_of_arg:
-                        # Command requires a name as first argument, and user
-                        # is currently typing the first argument
-                        return name_completer
-                    elif cmd == "move" and n_tokens == 2 or n_tokens == 3 and middle_of_arg:
-                        # User is typing a move command, and is currently at the
-                        # last argument
-                        return up_down_completer
-
-                # If nothing checks out, return no completion
-                return dummy_completer
+
+            # If nothing checks out, return no completion
+            return arg_completers.get((input_tokens[0], arg_idx), dummy_completer)
 
         return DynamicCompleter(get_correct_completer)
 
@@ -466,6 +517,23 @@ class Repl(Application):
         self.output_area.text = "\n" + self.parse(user_input)
 
 
+# Command lookup tables, built once since the set of commands is fixed.
+_CMD_FUNCS = {cmd: getattr(Repl, f"cmd_{cmd}") for cmd in Repl.commands}
+_DISPATCH = {
+    cmd: _make_dispatcher(cmd, function, Repl.command_usage[cmd])
+    for cmd, function in _CMD_FUNCS.items()
+}
+_FULL_HELP = {
+    cmd: cleandoc(function.__doc__)
+    for cmd, function in _CMD_FUNCS.items()
+    if function.__doc__ is not None
+}
+_HELP_ROWS = [
+    (cmd, full_help.split("\n", maxsplit=1)[0], Repl.command_usage[cmd])
+    for cmd, full_help in _FULL_HELP.items()
+]
+
+
 def repl():
     """Create a Repl instance and run it."""
     Repl().run()
@@ -1,7 +1,13 @@
 """Initiative tracking logic."""
+from array import array
 from bisect import bisect_left, bisect_right
 from typing import Iterator, Tuple
 
+# Initiatives are stored as native signed integers of this type
+_INITIATIVE_TYPECODE = "q"
+_MAX_INITIATIVE = 2 ** (8 * array(_INITIATIVE_TYPECODE).itemsize - 1) - 1
+_MIN_INITIATIVE = -_MAX_INITIATIVE - 1
+
 
 class InitiativeQueue:
     """Initiative tracking queue.
@@ -10,8 +16,8 @@ class InitiativeQueue:
     iteration and item accessing.
 
     This is effectively a priority queue, but is implemented with O(n)
-    insertion, deletion and lookup. This is not supposed to be an efficient
-    data structure, just one that is easy to use in the RFI REPL.
+    insertion and deletion, and O(1) lookup by name. This is not supposed to
+    be an efficient data structure, just one that is easy to use in the RFI REPL.
 
     See add, remove, move_up and move_down as the main functions.
     """
@@ -22,37 +28,57 @@ class InitiativeQueue:
         # There is no key function, and creating a new list every time would be
         # unnecessary.
         self.names = []
-        self.initiatives = []
-
-    def add(self, name: str, initiative: int) -> None:
+        # Initiatives are kept in a native int array, which shifts faster on insertion
+        # and deletion than a list of int objects.
+        self.initiatives = array(_INITIATIVE_TYPECODE)
+        # Index of each name in self.names, so lookups don't need a linear scan
+        self.name_to_idx = {}
+        # Incremented on every change, so users can tell if the queue was modified
+        self.version = 0
+        # Plain and highlighted display rows of each entry, parallel to self.names.
+        # Built when entries change, so format_rows doesn't have to format anything.
+        self._display_rows = []
+
+    def add(self, name: str, initiative: int) -> int:
         """Add a name to the initiative queue.
 
         Arguments:
             name (str): name of the new entry.
             initiative (int): entry initiative, with higher values coming first.
 
+        Returns:
+            position (int): position of the new entry, as in position_of.
+
         Raises:
             ValueError: if called with a name that is already in the queue.
+            ValueError: if the initiative is not an integer or is too large to be stored.
 
         """
-        if name in self.names:
+        if name in self.name_to_idx:
             raise ValueError("Duplicate name in initiative queue.")
+        self._check_initiative(initiative)
 
         insertion_idx = bisect_left(self.initiatives, initiative)
         self._add(name, initiative, insertion_idx)
+        return len(self) - insertion_idx - 1
 
-    def remove(self, name: str) -> None:
+    def remove(self, name: str) -> int:
         """Remove an entry from the queue.
 
         Arguments:
             name (str): name of entry to be removed.
 
+        Returns:
+            position (int): position the entry had before being removed.
+
         Raises:
             ValueError: if the name is not in the queue.
 
         """
         removal_idx = self._get_index(name)
+        position = len(self) - removal_idx - 1
         self._remove(removal_idx)
+        return position
 
     def update(self, name: str, new_initiative: int) -> None:
         """Update the initiative of an entry.
@@ -67,10 +93,23 @@ class InitiativeQueue:
 
         Raises:
             ValueError: if the name is not in the queue.
+            ValueError: if the new initiative is not an integer or is too large to be stored.
 
         """
-        self.remove(name)
-        self.add(name, new_initiative)
+        idx = self._get_index(name)
+        self._check_initiative(new_initiative)
+        initiatives = self.initiatives
+        if (idx == 0 or initiatives[idx - 1] < new_initiative) and (
+            idx == len(initiatives) - 1 or initiatives[idx + 1] >= new_initiative
+        ):
+            # Reinserting would put the entry back at the same index,
+            # so there is no need to shift the lists around.
+            initiatives[idx] = new_initiative
+            self._display_rows[idx] = self._make_display_rows(name, new_initiative)
+            self._changed()
+        else:
+            self._remove(idx)
+            self._add(name, new_initiative, bisect_left(initiatives, new_initiative))
 
     def update_name(self, name: str, new_name: str) -> None:
         """Change the name of an entry.
@@ -85,9 +124,13 @@ class InitiativeQueue:
 
         """
         idx = self._get_index(name)
-        if new_name in self.names:
+        if new_name in self.name_to_idx:
             raise ValueError("Desired name already exists in queue.")
         self.names[idx] = new_name
+        del self.name_to_idx[name]
+        self.name_to_idx[new_name] = idx
+        self._display_rows[idx] = self._make_display_rows(new_name, self.initiatives[idx])
+        self._changed()
 
     def move_up(self, name: str) -> None:
         """Move a name up (closer to index 0) in case of a tie.
@@ -108,7 +151,7 @@ class InitiativeQueue:
         max_valid_idx = bisect_right(self.initiatives, initiative) - 1
 
         if max_valid_idx > original_idx:
-            self._move(original_idx, original_idx + 1)
+            self._swap(original_idx, original_idx + 1)
         else:
             raise ValueError(f"Can't move {name} up without violating initiative order.")
 
@@ -131,7 +174,7 @@ class InitiativeQueue:
         min_valid_idx = bisect_left(self.initiatives, initiative)
 
         if min_valid_idx < original_idx:
-            self._move(original_idx, original_idx - 1)
+            self._swap(original_idx, original_idx - 1)
         else:
             raise ValueError(f"Can't move {name} down without violating initiative order.")
 
@@ -148,36 +191,89 @@ class InitiativeQueue:
         idx = self._get_index(name)
         return len(self) - idx - 1
 
+    def format_rows(self, cursor_pos: int = None) -> Tuple[Tuple[str, str, str, str], ...]:
+        """Format entries as table rows, in initiative order.
+
+        Each row is (left_bracket, initiative, name, right_bracket), where the
+        brackets are only present on the row at the cursor position.
+
+        Arguments:
+            cursor_pos (int, optional): position of the entry to be highlighted.
+
+        Returns:
+            rows (tuple): one row of strings per entry.
+
+        """
+        return tuple(
+            templates[position == cursor_pos]
+            for position, templates in enumerate(reversed(self._display_rows))
+        )
+
     def clear(self) -> None:
         """Clear queue entries."""
         self.names.clear()
-        self.initiatives.clear()
+        del self.initiatives[:]
+        self.name_to_idx.clear()
+        self._display_rows.clear()
+        self._changed()
+
+    @staticmethod
+    def _check_initiative(initiative: int) -> None:
+        if not isinstance(initiative, int):
+            raise ValueError(f"Initiative is not an integer: {initiative}")
+        if not _MIN_INITIATIVE <= initiative <= _MAX_INITIATIVE:
+            raise ValueError(f"Initiative out of range: {initiative}")
 
     def _get_index(self, name: str) -> int:
-        try:
-            return self.names.index(name)
-        except ValueError:
+        idx = self.name_to_idx.get(name, -1)
+        if idx < 0:
             raise ValueError(f"Name not in initiative queue: {name}")
+        return idx
 
     def _add(self, name: str, initiative: int, idx: int) -> None:
-        self.names.insert(idx, name)
+        # The array is the only insertion that can fail, so it goes first
         self.initiatives.insert(idx, initiative)
+        self.names.insert(idx, name)
+        self._display_rows.insert(idx, self._make_display_rows(name, initiative))
+        self._reindex_from(idx)
+        self._changed()
 
     def _remove(self, idx: int) -> (str, int):
         name, initiative = self.names[idx], self.initiatives[idx]
         del self.names[idx]
         del self.initiatives[idx]
+        del self._display_rows[idx]
+        del self.name_to_idx[name]
+        self._reindex_from(idx)
+        self._changed()
         return name, initiative
 
-    def _move(self, original_idx: int, final_idx: int) -> None:
-        name, initiative = self._remove(original_idx)
-        self._add(name, initiative, final_idx)
+    def _changed(self) -> None:
+        self.version += 1
+
+    @staticmethod
+    def _make_display_rows(name: str, initiative: int) -> tuple:
+        initiative_str = str(initiative)
+        return ("", initiative_str, name, ""), ("[", initiative_str, name, "]")
+
+    def _reindex_from(self, idx: int) -> None:
+        # Entries from idx onwards were shifted by the last insertion or deletion
+        for shifted_idx in range(idx, len(self.names)):
+            self.name_to_idx[self.names[shifted_idx]] = shifted_idx
+
+    def _swap(self, idx: int, other_idx: int) -> None:
+        # Only used on tied entries, so the initiatives can stay where they are
+        names = self.names
+        names[idx], names[other_idx] = names[other_idx], names[idx]
+        rows = self._display_rows
+        rows[idx], rows[other_idx] = rows[other_idx], rows[idx]
+        self.name_to_idx[names[idx]] = idx
+        self.name_to_idx[names[other_idx]] = other_idx
+        self._changed()
 
     def __iter__(self) -> Iterator[Tuple[str, int]]:
-        """Iterate over self[idx] without looping."""
-        max_idx = len(self)
-        for idx in range(max_idx):
-            yield self[idx]
+        """Iterate over (name, initiative) pairs, in initiative order."""
+        return zip(reversed(self.names), reversed(self.initiatives))
 
     def __len__(self) -> int:
         """Retrieve size of queue."""
@@ -185,7 +281,7 @@ class InitiativeQueue:
 
     def __contains__(self, name: str) -> bool:
         """Check if there is an entry with the given name."""
-        return name in self.names
+        return name in self.name_to_idx
 
     def __bool__(self) -> bool:
         """Check if the queue has elements in it."""
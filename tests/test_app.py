@@ -0,0 +1,130 @@
+"""Test Repl command handling."""
+import pytest
+from prompt_toolkit.input.defaults import create_pipe_input, set_default_input
+from prompt_toolkit.output import DummyOutput
+from prompt_toolkit.output.defaults import set_default_output
+
+# pylint: disable=invalid-name,redefined-outer-name
+from rfi.app import Repl, _arity_of, _dice_roll_sum
+
+
+@pytest.fixture
+def r():
+    """Build a Repl without running it or touching the terminal."""
+    pipe_input = create_pipe_input()
+    set_default_input(pipe_input)
+    set_default_output(DummyOutput())
+    yield Repl()
+    pipe_input.close()
+
+
+def test_wrong_argument_count(r):
+    """Test commands called with too few or too many arguments returning their usage."""
+    output = r.parse("add Tasha")
+    assert output.splitlines() == [
+        "Invalid usage of add.",
+        "Expected usage: add {name} {initiative}",
+        "Type help add for more information.",
+    ]
+    assert "Tasha" not in r.queue
+
+    assert r.parse("remove Tasha Elyn").startswith("Invalid usage of remove.")
+    assert r.parse("show all").startswith("Invalid usage of show.")
+
+
+def test_unknown_command(r):
+    """Test unknown commands being reported."""
+    assert r.parse("bogus") == "Unknown command: bogus."
+    assert r.parse("bogus with args") == "Unknown command: bogus."
+
+
+def test_command_errors(r):
+    """Test ValueError and RuntimeError from commands becoming error messages."""
+    assert r.parse("remove Tasha") == "Error: Name not in initiative queue: Tasha"
+    assert r.parse("next") == 'Error: Attempt to move cursor before call to "start"'
+
+    r.parse("add Tasha 18")
+    assert r.parse("add Tasha 12") == "Error: Duplicate name in initiative queue."
+    assert r.parse("move Tasha sideways") == 'Error: Direction must be "up" or "down"'
+    assert list(r.queue) == [("Tasha", 18)]
+
+
+def test_arity_of():
+    """Test argument bounds matching a call as function(self, *args)."""
+    # pylint: disable=unused-argument
+
+    def positional(self, name, initiative=None):
+        pass
+
+    def var_positional(self, name, *rest):
+        pass
+
+    def keyword_only(self, name, *, initiative=None):
+        pass
+
+    assert _arity_of(positional) == (1, 2)
+    assert _arity_of(var_positional) == (1, float("inf"))
+    assert _arity_of(keyword_only) == (1, 1)
+
+    assert _arity_of(Repl.cmd_help) == (0, 1)
+    assert _arity_of(Repl.cmd_add) == (2, 2)
+    assert _arity_of(Repl.cmd_show) == (0, 0)
+
+
+def test_cursor_wrapping(r):
+    """Test the cursor wrapping around both ends and following its entry."""
+    for line in ["add Tasha 18", "add Elyn 12", "add Isis 6"]:
+        r.parse(line)
+
+    def current():
+        return r.queue[r.cursor_pos][0]
+
+    r.parse("start")
+    assert current() == "Tasha"
+    r.parse("prev")
+    assert current() == "Isis"
+    r.parse("next")
+    assert current() == "Tasha"
+    r.parse("next")
+    r.parse("next")
+    assert current() == "Isis"
+    r.parse("next")
+    assert current() == "Tasha"
+    r.parse("")
+    assert current() == "Elyn"
+
+    # Entries added or removed before the cursor shift it along
+    r.parse("add Buzz 20")
+    assert r.cursor_pos == 2
+    assert current() == "Elyn"
+    r.parse("remove Tasha")
+    assert r.cursor_pos == 1
+    assert current() == "Elyn"
+    r.parse("add Explictica 3")
+    r.parse("remove Isis")
+    assert current() == "Elyn"
+
+    # Removing the last entry while the cursor is on it wraps to the top
+    r.parse("next")
+    assert current() == "Explictica"
+    r.parse("remove Explictica")
+    assert current() == "Buzz"
+
+    r.parse("removeall")
+    assert r.cursor_pos is None
+
+
+def test_dice_roll_sum():
+    """Test initiative expressions, with and without dice."""
+    assert _dice_roll_sum("15") == 15
+    assert _dice_roll_sum("-3") == -3
+    assert _dice_roll_sum("+2") == 2
+    assert _dice_roll_sum("2d1+1") == 3
+    assert _dice_roll_sum("4d1") == 4
+
+
+@pytest.mark.parametrize("expr", ["1d", "abc", "", "\u0661\u0665"])
+def test_dice_roll_sum_invalid(expr):
+    """Test invalid expressions, including non-ASCII digits, raising ValueError."""
+    with pytest.raises(ValueError):
+        _dice_roll_sum(expr)
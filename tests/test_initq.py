@@ -1,10 +1,22 @@
 """Test InitiativeQueue behavior."""
 import pytest
 
-# pylint: disable=invalid-name
+# pylint: disable=invalid-name,redefined-outer-name
 from rfi.initiative import InitiativeQueue
 
 
+@pytest.fixture
+def standard_q():
+    """Build a queue with a three-way tie at initiative 15."""
+    q = InitiativeQueue()
+    q.add("Tasha", 18)
+    q.add("Buzz", 15)
+    q.add("Elyn", 15)
+    q.add("Explictica", 15)
+    q.add("Isis", 14)
+    return q
+
+
 def test_item_accessing_no_ties():
     """Test insertion order without ties."""
     q = InitiativeQueue()
@@ -53,15 +65,9 @@ def test_insertion_with_ties():
     assert q[-2] == ("Explictica", 15)
 
 
-def test_move_up():
-    """Test InitiativeQueue.move_up behavior and errors."""
-    q = InitiativeQueue()
-    q.add("Tasha", 18)
-    q.add("Buzz", 15)
-    q.add("Elyn", 15)
-    q.add("Explictica", 15)
-    q.add("Isis", 14)
-
+def test_move_up(standard_q):
+    """Test InitiativeQueue.move_up behavior."""
+    q = standard_q
     q.move_up("Elyn")
     assert q[0] == ("Tasha", 18)
     assert q[1] == ("Elyn", 15)
@@ -69,17 +75,15 @@ def test_move_up():
     assert q[3] == ("Explictica", 15)
     assert q[4] == ("Isis", 14)
 
-    with pytest.raises(ValueError):
-        q.move_up("Elyn")
-
-    with pytest.raises(ValueError):
-        q.move_up("Isis")
 
-    with pytest.raises(ValueError):
-        q.move_up("Tasha")
+@pytest.mark.parametrize("name", ["Elyn", "Isis", "Tasha", "RandomName"])
+def test_move_up_errors(standard_q, name):
+    """Test InitiativeQueue.move_up errors leaving the queue untouched."""
+    q = standard_q
+    q.move_up("Elyn")
 
     with pytest.raises(ValueError):
-        q.move_up("RandomName")
+        q.move_up(name)
 
     assert q[0] == ("Tasha", 18)
     assert q[1] == ("Elyn", 15)
@@ -88,15 +92,9 @@ def test_move_up():
     assert q[4] == ("Isis", 14)
 
 
-def test_move_down():
-    """Test InitiativeQueue.move_down behavior and errors."""
-    q = InitiativeQueue()
-    q.add("Tasha", 18)
-    q.add("Buzz", 15)
-    q.add("Elyn", 15)
-    q.add("Explictica", 15)
-    q.add("Isis", 14)
-
+def test_move_down(standard_q):
+    """Test InitiativeQueue.move_down behavior."""
+    q = standard_q
     q.move_down("Elyn")
     assert q[0] == ("Tasha", 18)
     assert q[1] == ("Buzz", 15)
@@ -104,17 +102,15 @@ def test_move_down():
     assert q[3] == ("Elyn", 15)
     assert q[4] == ("Isis", 14)
 
-    with pytest.raises(ValueError):
-        q.move_down("Elyn")
-
-    with pytest.raises(ValueError):
-        q.move_down("Isis")
 
-    with pytest.raises(ValueError):
-        q.move_down("Tasha")
+@pytest.mark.parametrize("name", ["Elyn", "Isis", "Tasha", "RandomName"])
+def test_move_down_errors(standard_q, name):
+    """Test InitiativeQueue.move_down errors leaving the queue untouched."""
+    q = standard_q
+    q.move_down("Elyn")
 
     with pytest.raises(ValueError):
-        q.move_down("RandomName")
+        q.move_down(name)
 
     assert q[0] == ("Tasha", 18)
     assert q[1] == ("Buzz", 15)
@@ -154,15 +150,9 @@ def test_remove():
         _ = q[0]
 
 
-def test_len():
+def test_len(standard_q):
     """Test len of InitiativeQueue."""
-    q = InitiativeQueue()
-    q.add("Tasha", 18)
-    q.add("Buzz", 15)
-    q.add("Elyn", 15)
-    q.add("Explictica", 15)
-    q.add("Isis", 14)
-
+    q = standard_q
     assert len(q) == 5
 
     q.remove("Buzz")
@@ -170,15 +160,9 @@ def test_len():
     assert len(q) == 4
 
 
-def test_update():
+def test_update(standard_q):
     """Test updating initiative."""
-    q = InitiativeQueue()
-    q.add("Tasha", 18)
-    q.add("Buzz", 15)
-    q.add("Elyn", 15)
-    q.add("Explictica", 15)
-    q.add("Isis", 14)
-
+    q = standard_q
     assert q[0] == ("Tasha", 18)
     assert q[1] == ("Buzz", 15)
     assert q[2] == ("Elyn", 15)
@@ -197,15 +181,9 @@ def test_update():
         q.update("RandomName", 7)
 
 
-def test_update_name():
+def test_update_name(standard_q):
     """Test name changing."""
-    q = InitiativeQueue()
-    q.add("Tasha", 18)
-    q.add("Buzz", 15)
-    q.add("Elyn", 15)
-    q.add("Explictica", 15)
-    q.add("Isis", 14)
-
+    q = standard_q
     assert q[0] == ("Tasha", 18)
     assert q[1] == ("Buzz", 15)
     assert q[2] == ("Elyn", 15)
@@ -296,3 +274,150 @@ def test_clear():
     q.clear()
 
     assert not q
+
+
+def test_format_rows():
+    """Test row formatting and its invalidation on changes."""
+    q = InitiativeQueue()
+    q.add("Tasha", 18)
+    q.add("Elyn", 12)
+
+    assert q.format_rows() == (("", "18", "Tasha", ""), ("", "12", "Elyn", ""))
+    assert q.format_rows(1) == (("", "18", "Tasha", ""), ("[", "12", "Elyn", "]"))
+
+    q.add("Explictica", 15)
+    assert q.format_rows(0) == (
+        ("[", "18", "Tasha", "]"),
+        ("", "15", "Explictica", ""),
+        ("", "12", "Elyn", ""),
+    )
+
+    q.update_name("Explictica", "snek")
+    q.update("Elyn", 20)
+    assert q.format_rows(0) == (
+        ("[", "20", "Elyn", "]"),
+        ("", "18", "Tasha", ""),
+        ("", "15", "snek", ""),
+    )
+
+    q.clear()
+    assert q.format_rows() == ()
+
+
+def test_position_of_after_changes():
+    """Test position_of staying consistent as entries shift around."""
+    q = InitiativeQueue()
+    q.add("Tasha", 18)
+    q.add("Buzz", 15)
+    q.add("Elyn", 15)
+    q.add("Explictica", 8)
+    q.add("Isis", 17)
+
+    q.remove("Isis")
+    q.move_up("Elyn")
+    q.update_name("Buzz", "snek")
+    q.update("Explictica", 20)
+
+    assert list(q) == [("Explictica", 20), ("Tasha", 18), ("Elyn", 15), ("snek", 15)]
+    for position, (name, _) in enumerate(q):
+        assert q.position_of(name) == position
+    assert q.format_rows() == tuple(("", str(init), name, "") for name, init in q)
+
+    assert "Buzz" not in q
+    assert "Isis" not in q
+    with pytest.raises(ValueError):
+        q.position_of("Buzz")
+
+
+@pytest.mark.parametrize("new_initiative", range(12, 21))
+def test_update_matches_remove_and_add(new_initiative):
+    """Test update resulting in the same order as remove followed by add."""
+    q = InitiativeQueue()
+    expected = InitiativeQueue()
+    for name, initiative in [("Tasha", 18), ("Buzz", 15), ("Elyn", 15), ("Isis", 14)]:
+        q.add(name, initiative)
+        expected.add(name, initiative)
+
+    q.update("Elyn", new_initiative)
+    expected.remove("Elyn")
+    expected.add("Elyn", new_initiative)
+
+    assert list(q) == list(expected)
+    assert q.position_of("Elyn") == expected.position_of("Elyn")
+    assert q.format_rows(1) == expected.format_rows(1)
+
+
+def test_version():
+    """Test version changing only when the queue is modified."""
+    q = InitiativeQueue()
+    versions = [q.version]
+
+    q.add("Tasha", 18)
+    q.add("Elyn", 18)
+    versions.append(q.version)
+    q.move_up("Elyn")
+    versions.append(q.version)
+    q.update("Elyn", 12)
+    versions.append(q.version)
+    q.update_name("Elyn", "snek")
+    versions.append(q.version)
+    q.remove("snek")
+    versions.append(q.version)
+    q.clear()
+    versions.append(q.version)
+    assert len(set(versions)) == len(versions)
+
+    q.add("Tasha", 18)
+    version = q.version
+    _ = list(q), q.format_rows(0), q.position_of("Tasha"), "Tasha" in q
+    with pytest.raises(ValueError):
+        q.add("Tasha", 12)
+    assert q.version == version
+
+
+def test_add_remove_positions():
+    """Test add and remove returning the position of the entry."""
+    q = InitiativeQueue()
+    assert q.add("Tasha", 18) == 0
+    assert q.add("Elyn", 12) == 1
+    assert q.add("Explictica", 15) == 1
+    assert q.add("Buzz", 15) == 2
+    assert q.add("Isis", 20) == 0
+
+    assert q.remove("Explictica") == 2
+    assert q.remove("Elyn") == 3
+    assert q.remove("Isis") == 0
+
+
+def test_initiative_out_of_range():
+    """Test rejecting initiatives that don't fit in storage."""
+    q = InitiativeQueue()
+    q.add("Tasha", 18)
+
+    with pytest.raises(ValueError):
+        q.add("Elyn", 2 ** 64)
+
+    with pytest.raises(ValueError):
+        q.update("Tasha", -(2 ** 64))
+
+    assert list(q) == [("Tasha", 18)]
+
+
+@pytest.mark.parametrize("initiative", [2.5, "15", None])
+def test_non_int_initiative(standard_q, initiative):
+    """Test rejecting non-integer initiatives without changing the queue."""
+    q = standard_q
+    entries = list(q)
+    version = q.version
+
+    with pytest.raises(ValueError):
+        q.add("Buzz2", initiative)
+
+    with pytest.raises(ValueError):
+        q.update("Elyn", initiative)
+
+    assert list(q) == entries
+    assert len(q) == 5
+    assert "Buzz2" not in q
+    assert q.position_of("Elyn") == 2
+    assert q.version == version